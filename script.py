@@ -1,33 +1,83 @@
 import serial
 import sqlite3
 import threading
+import collections
+import contextlib
+import selectors
+import concurrent.futures
 import time
 from datetime import datetime
-import sys
+import logging
+from serial_common import (
+    ReceiveStats,
+    decode_text,
+    fmt_ts,
+    read_available,
+    serial_fileno,
+    setup_logging,
+    split_lines,
+)
+
+log = logging.getLogger("serial_debug")
+
+# Maps every byte to itself if printable ASCII, otherwise to "?"
+_PRINTABLE = bytes(b if 32 <= b <= 126 else ord("?") for b in range(256))
 
 
 class DebugSerialLogger:
-    def __init__(self, port, baudrate=9600, db_name="serial_debug.db"):
+    FLUSH_INTERVAL = 0.2  # Seconds between batched writes
+    FLUSH_BATCH_SIZE = 256  # Flush early once this many rows are pending
+    READ_TIMEOUT = 1.0  # Longest blocking wait, so stop() is noticed
+    INTER_BYTE_TIMEOUT = 0.05  # Idle gap after which a partial line is returned
+    _INSERT_SQL = """
+        INSERT INTO serial_logs (data, data_type, raw_bytes, byte_count)
+        VALUES (?, ?, ?, ?)
+    """
+
+    def __init__(
+        self, port, baudrate=9600, db_name="serial_debug.db", serial_lock=None
+    ):
         self.port = port
         self.baudrate = baudrate
         self.db_name = db_name
         self.serial_conn = None
+        # Pass a shared lock when other threads also use this serial port
+        self._serial_lock = serial_lock or contextlib.nullcontext()
         self.db_conn = None
         self.running = False
         self.log_thread = None
-        self.stats = {
-            "bytes_received": 0,
-            "messages_received": 0,
-            "last_data_time": None,
-        }
+        self._stats = ReceiveStats()
+
+        # Decoding and logging run here so the reader goes straight back to
+        # waiting on the port; one worker keeps messages in arrival order
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="serial-proc"
+        )
+
+        # Rows waiting to be written by the flush thread
+        self._pending = collections.deque()
+        self._pending_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self.flushing = False
+        self.flush_thread = None
 
         self.setup_database()
+        self.start_flushing()
 
     def setup_database(self):
         """Initialize database with debug info"""
-        self.db_conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        # Autocommit mode: flush() opens its own transaction per batch
+        self.db_conn = sqlite3.connect(
+            self.db_name, check_same_thread=False, isolation_level=None
+        )
         cursor = self.db_conn.cursor()
 
+        # WAL avoids a full fsync on every commit
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+
         cursor.execute(
             """
             CREATE TABLE IF NOT EXISTS serial_logs (
@@ -35,13 +85,14 @@ class DebugSerialLogger:
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                 data TEXT,
                 data_type TEXT,
-                raw_bytes TEXT,
+                raw_bytes BLOB,
                 byte_count INTEGER
             )
         """
         )
 
-        self.db_conn.commit()
+        # Reused by every flush instead of opening a cursor per batch
+        self._insert_cursor = self.db_conn.cursor()
         print(f"Database ready: {self.db_name}")
 
     def connect(self):
@@ -52,7 +103,8 @@ class DebugSerialLogger:
             self.serial_conn = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=0.1,  # Short timeout for non-blocking reads
+                timeout=self.READ_TIMEOUT,
+                inter_byte_timeout=self.INTER_BYTE_TIMEOUT,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
@@ -72,20 +124,49 @@ class DebugSerialLogger:
             return False
 
     def log_data(self, data, raw_bytes, data_type="auto_received"):
-        """Log data with raw bytes info"""
-        try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
-                """
-                INSERT INTO serial_logs (data, data_type, raw_bytes, byte_count)
-                VALUES (?, ?, ?, ?)
-            """,
-                (data, data_type, str(raw_bytes), len(raw_bytes)),
+        """Queue data with raw bytes info for the flush thread"""
+        with self._pending_lock:
+            self._pending.append(
+                (data, data_type, sqlite3.Binary(raw_bytes), len(raw_bytes))
             )
-            self.db_conn.commit()
+            pending_count = len(self._pending)
+
+        if pending_count >= self.FLUSH_BATCH_SIZE:
+            self._flush_event.set()
+
+    def start_flushing(self):
+        """Start the background thread that writes queued rows"""
+        if self.flushing:
+            return
+
+        self.flushing = True
+        self.flush_thread = threading.Thread(target=self._flush_loop)
+        self.flush_thread.daemon = True
+        self.flush_thread.start()
+
+    def _flush_loop(self):
+        """Write queued rows every FLUSH_INTERVAL or once a batch is full"""
+        while self.flushing:
+            self._flush_event.wait(self.FLUSH_INTERVAL)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all queued rows in a single transaction"""
+        with self._pending_lock:
+            if not self._pending:
+                return
+            rows = list(self._pending)
+            self._pending.clear()
+
+        try:
+            # Commits on success, rolls back if the insert fails
+            with self.db_conn:
+                self._insert_cursor.execute("BEGIN IMMEDIATE")
+                self._insert_cursor.executemany(self._INSERT_SQL, rows)
 
         except Exception as e:
-            print(f"Logging error: {e}")
+            print(f"Logging error: {e} ({len(rows)} rows dropped)")
 
     def start_monitoring(self):
         """Start monitoring with verbose debug info"""
@@ -104,74 +185,115 @@ class DebugSerialLogger:
         print("-" * 50)
 
     def _monitor_loop(self):
-        """Enhanced monitoring loop with multiple read methods"""
+        """Enhanced monitoring loop reading one line at a time"""
         last_activity_report = time.time()
+        selector = selectors.DefaultSelector()
+        selected_conn = selected_fd = None
+        pending = bytearray()  # Start of a line still waiting for its newline
+
+        # Bound once instead of looked up again on every read
+        submit = self._pool.submit
+        process_line = self._process_line
+        _now = datetime.now
+        read_args = (self._serial_lock, self.INTER_BYTE_TIMEOUT, self.READ_TIMEOUT)
 
         while self.running:
             try:
-                if self.serial_conn and self.serial_conn.is_open:
-                    # Method 1: Check bytes waiting
-                    bytes_waiting = self.serial_conn.in_waiting
-                    if bytes_waiting > 0:
-                        print(f"{bytes_waiting} bytes waiting in buffer")
-
-                    # Method 2: Try to read a line
+                serial_conn = self.serial_conn
+                if serial_conn and serial_conn.is_open:
                     try:
-                        raw_data = self.serial_conn.readline()
-                        if raw_data:
-                            self.stats["bytes_received"] += len(raw_data)
-                            self.stats["messages_received"] += 1
-                            self.stats["last_data_time"] = datetime.now()
-
-                            # Try to decode
-                            try:
-                                decoded_data = raw_data.decode("utf-8").strip()
-                                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                                print(
-                                    f"[{timestamp}] RECEIVED: '{decoded_data}' (bytes: {len(raw_data)})"
-                                )
-                                self.log_data(decoded_data, raw_data, "auto_received")
-                            except UnicodeDecodeError:
-                                # Handle binary data
-                                hex_data = raw_data.hex()
-                                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                                print(
-                                    f"[{timestamp}] BINARY: {hex_data} (bytes: {len(raw_data)})"
-                                )
-                                self.log_data(hex_data, raw_data, "binary_received")
+                        if serial_conn is not selected_conn:
+                            # New connection: watch its descriptor instead
+                            if selected_fd is not None:
+                                selector.unregister(selected_fd)
+                            selected_conn = serial_conn
+                            selected_fd = serial_fileno(serial_conn)
+                            if selected_fd is not None:
+                                selector.register(selected_fd, selectors.EVENT_READ)
+                            pending.clear()
+
+                        if selected_fd is None:
+                            # No pollable descriptor: let pyserial block in readline()
+                            with self._serial_lock:
+                                chunk = serial_conn.readline()
+                        else:
+                            chunk = read_available(
+                                selector, selected_fd, pending, *read_args
+                            )
+
+                        now = _now()
+                        for raw_data in split_lines(chunk):
+                            submit(process_line, raw_data, now)
 
                     except Exception as read_error:
                         print(f"Read error: {read_error}")
-
-                    # Method 3: Try reading single bytes (for devices that don't send newlines)
-                    try:
-                        if self.serial_conn.in_waiting > 0:
-                            single_byte = self.serial_conn.read(1)
-                            if single_byte:
-                                print(
-                                    f"Single byte: {single_byte.hex()} ('{chr(single_byte[0]) if 32 <= single_byte[0] <= 126 else '?'}')"
-                                )
-                    except:
-                        pass
+                        # A hung-up port stays readable: don't spin on it
+                        time.sleep(1)
+                else:
+                    time.sleep(1)  # No open port to block on
 
                 # Progress report every 5 seconds
                 if time.time() - last_activity_report > 5:
                     self.show_stats()
                     last_activity_report = time.time()
 
-                time.sleep(0.01)  # Very short sleep
-
             except Exception as e:
                 print(f"Monitor loop error: {e}")
                 time.sleep(1)
 
+        selector.close()
+
+    def _process_line(self, raw_data, now):
+        """Decode, print and queue one received line (runs on the pool)"""
+        try:
+            self._stats.bytes_received += len(raw_data)
+            self._stats.messages_received += 1
+            self._stats.last_data_time = now
+            timestamp = fmt_ts(now)
+
+            # Try to decode
+            decoded_data = decode_text(raw_data)
+            if decoded_data is not None:
+                decoded_data = decoded_data.strip()
+                log.info(
+                    "[%s] RECEIVED: '%s' (bytes: %d)",
+                    timestamp,
+                    decoded_data,
+                    len(raw_data),
+                )
+                self.log_data(decoded_data, raw_data, "auto_received")
+            else:
+                # Handle binary data
+                hex_data = raw_data.hex()
+                preview = raw_data.translate(_PRINTABLE).decode("ascii")
+                log.info(
+                    "[%s] BINARY: %s ('%s') (bytes: %d)",
+                    timestamp,
+                    hex_data,
+                    preview,
+                    len(raw_data),
+                )
+                self.log_data(hex_data, raw_data, "binary_received")
+
+        except Exception as e:
+            print(f"Processing error: {e}")
+
+    @property
+    def stats(self):
+        """Snapshot of the receive statistics as a dict"""
+        return {
+            "bytes_received": self._stats.bytes_received,
+            "messages_received": self._stats.messages_received,
+            "last_data_time": self._stats.last_data_time,
+        }
+
     def show_stats(self):
         """Show monitoring statistics"""
         print(
-            f"STATS: {self.stats['messages_received']} messages, {self.stats['bytes_received']} bytes total"
+            f"STATS: {self._stats.messages_received} messages, {self._stats.bytes_received} bytes total"
         )
-        if self.stats["last_data_time"]:
-            print(f"   Last data: {self.stats['last_data_time'].strftime('%H:%M:%S')}")
+        if self._stats.last_data_time:
+            print(f"   Last data: {self._stats.last_data_time.strftime('%H:%M:%S')}")
         else:
             print("   No data received yet")
 
@@ -184,8 +306,9 @@ class DebugSerialLogger:
         try:
             # Send command
             cmd_bytes = f"{command}\n".encode()
-            bytes_sent = self.serial_conn.write(cmd_bytes)
-            timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+            with self._serial_lock:
+                bytes_sent = self.serial_conn.write(cmd_bytes)
+            timestamp = fmt_ts(datetime.now())
             print(f"[{timestamp}] SENT: '{command}' ({bytes_sent} bytes)")
 
             # Log the sent command
@@ -208,13 +331,17 @@ class DebugSerialLogger:
 
         print("Testing connection...")
         print(f"   Port open: {self.serial_conn.is_open}")
-        print(f"   Bytes waiting: {self.serial_conn.in_waiting}")
+        with self._serial_lock:
+            bytes_waiting = self.serial_conn.in_waiting
+        print(f"   Bytes waiting: {bytes_waiting}")
 
         # Try to read any available data
         try:
-            available_data = self.serial_conn.read(self.serial_conn.in_waiting)
+            with self._serial_lock:
+                available_data = self.serial_conn.read(self.serial_conn.in_waiting)
             if available_data:
-                print(f"   Available data: {available_data.hex()}")
+                preview = available_data.translate(_PRINTABLE).decode("ascii")
+                print(f"   Available data: {available_data.hex()} ('{preview}')")
             else:
                 print("   No data available")
         except Exception as e:
@@ -233,6 +360,16 @@ class DebugSerialLogger:
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
 
+        # Finish processing lines already read before the final flush
+        self._pool.shutdown(wait=True)
+
+        # Stop the flush thread and write whatever is still queued
+        self.flushing = False
+        self._flush_event.set()
+        if self.flush_thread and self.flush_thread.is_alive():
+            self.flush_thread.join(timeout=2)
+        self.flush()
+
         if self.db_conn:
             self.db_conn.close()
 
@@ -245,6 +382,7 @@ if __name__ == "__main__":
     # Configuration
     PORT = "/dev/ttyUSB0"  # Change this to your port
     BAUDRATE = 9600
+    DEBUG = False  # Print every received message instead of at most 20 per second
 
     print("SERIAL DEBUG LOGGER")
     print("=" * 50)
@@ -252,6 +390,7 @@ if __name__ == "__main__":
     print(f"Baudrate: {BAUDRATE}")
     print("=" * 50)
 
+    log_listener = setup_logging(log, DEBUG)
     logger = DebugSerialLogger(PORT, BAUDRATE)
 
     try:
@@ -297,3 +436,4 @@ if __name__ == "__main__":
 
     finally:
         logger.stop()
+        log_listener.stop()
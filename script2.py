@@ -1,34 +1,113 @@
 import serial
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, InterfaceError, OperationalError
 import threading
+import collections
+import multiprocessing
+import contextlib
+import os
+import struct
+import selectors
+import concurrent.futures
 import time
 from datetime import datetime
 import sys
+import logging
+import queue
+from serial_common import (
+    ReceiveStats,
+    decode_text,
+    fmt_ts,
+    read_available,
+    serial_fileno,
+    setup_logging,
+    split_lines,
+)
+
+log = logging.getLogger("antenna_logger")
+
+# Raw log record header: capture time (ns since epoch), antenna, frame length
+RECORD_HEADER = struct.Struct("<QBH")
+
+
+def frame_row(line, antenna):
+    """Build the serial_logs row (data, data_type, raw_bytes, byte_count, antenna)"""
+    decoded_data = decode_text(line)
+    if decoded_data is not None:
+        return (decoded_data.strip(), "auto_received", line, len(line), antenna)
+    return (line.hex(), "binary_received", line, len(line), antenna)
+
+
+def _pack_records(lines, now, antenna):
+    """Encode frames as raw log records, splitting any longer than 64 KiB"""
+    ts_ns = round(now.timestamp() * 1_000_000) * 1000
+    parts = []
+    for line in lines:
+        for start in range(0, len(line), 0xFFFF):
+            piece = line[start : start + 0xFFFF]
+            parts.append(RECORD_HEADER.pack(ts_ns, antenna, len(piece)))
+            parts.append(piece)
+    return b"".join(parts)
+
+
+def iter_records(buf, offset=0):
+    """Yield (next_offset, ts_ns, antenna, frame) for each complete record"""
+    end = len(buf)
+    while offset + RECORD_HEADER.size <= end:
+        ts_ns, antenna, length = RECORD_HEADER.unpack_from(buf, offset)
+        start = offset + RECORD_HEADER.size
+        if start + length > end:
+            break  # Record still being written
+        offset = start + length
+        yield offset, ts_ns, antenna, bytes(buf[start:offset])
+
+
+class TagDeduplicator:
+    """Remembers recent (antenna, tag) reads so repeats can be skipped"""
+
+    def __init__(self, window, capacity):
+        self.window = window
+        self.capacity = capacity
+        # Last time each (antenna, tag) was logged, oldest first
+        self._seen = collections.OrderedDict()
+
+    def is_duplicate(self, antenna, data, seen_at):
+        """Return True if this tag was logged on this antenna within the window"""
+        key = (antenna, data)
+        last_seen = self._seen.get(key)
+
+        if last_seen is not None and seen_at - last_seen < self.window:
+            self._seen.move_to_end(key)
+            return True
 
+        self._seen[key] = seen_at
+        self._seen.move_to_end(key)
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return False
 
-class AntennaSerialLogger:
-    def __init__(self, port, baudrate=9600, mysql_config=None):
-        self.port = port
-        self.baudrate = baudrate
-        self.mysql_config = mysql_config or {
-            "host": "localhost",
-            "database": "data_logs",
-            "user": "mateo",
-            "password": "password123",
-            "port": 3306,
-        }
-        self.serial_conn = None
-        self.db_conn = None
-        self.running = False
-        self.log_thread = None
-        self.stats = {
-            "bytes_received": 0,
-            "messages_received": 0,
-            "last_data_time": None,
-        }
+    def copy(self):
+        """Independent copy, so the reads of a retried batch can be rolled back"""
+        clone = TagDeduplicator(self.window, self.capacity)
+        clone._seen = self._seen.copy()
+        return clone
+
+
+class MySQLWriter:
+    """Owns the MySQL connection and inserts rows in batches"""
 
-        self.setup_database()
+    BATCH_SIZE = 256  # Most queued items merged into one executemany
+    FAILED_ROWS = "dropped"  # What happens to the rows of a failed batch
+    _INSERT_SQL = """
+        INSERT INTO serial_logs (data, data_type, raw_bytes, byte_count, antenna)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+
+    def __init__(self, mysql_config):
+        self.mysql_config = mysql_config
+        self.db_conn = None
+        self._insert_cursor = None
+        self._db_alive = False  # Cleared on a write error, set again on reconnect
 
     def setup_database(self):
         """Initialize MySQL database with antenna column"""
@@ -53,7 +132,7 @@ class AntennaSerialLogger:
                         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
                         data TEXT,
                         data_type VARCHAR(50),
-                        raw_bytes LONGTEXT,
+                        raw_bytes LONGBLOB,
                         byte_count INT,
                         antenna INT,
                         INDEX idx_timestamp (timestamp),
@@ -63,7 +142,36 @@ class AntennaSerialLogger:
                 """
                 )
 
+                # Tables from before raw_bytes was binary still have a text column
+                cursor.execute(
+                    """
+                    SELECT DATA_TYPE FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = %s AND TABLE_NAME = 'serial_logs'
+                        AND COLUMN_NAME = 'raw_bytes'
+                """,
+                    (self.mysql_config["database"],),
+                )
+                (column_type,) = cursor.fetchone()
+                if isinstance(column_type, (bytes, bytearray)):
+                    column_type = column_type.decode()
+                if column_type.lower() != "longblob":
+                    print(
+                        f"Converting serial_logs.raw_bytes from {column_type} to LONGBLOB..."
+                    )
+                    cursor.execute("ALTER TABLE serial_logs MODIFY raw_bytes LONGBLOB")
+                    if "text" in column_type.lower():
+                        # Old rows hold raw_bytes.hex() text: turn it back into bytes
+                        cursor.execute(
+                            "UPDATE serial_logs SET raw_bytes = UNHEX(raw_bytes) "
+                            "WHERE UNHEX(raw_bytes) IS NOT NULL"
+                        )
+
                 self.db_conn.commit()
+                cursor.close()
+
+                # Reused by every batch instead of opening a cursor each time
+                self._insert_cursor = self.db_conn.cursor()
+                self._db_alive = True
                 print(
                     f"MySQL database ready: {self.mysql_config['host']}:{self.mysql_config['port']}/{self.mysql_config['database']}"
                 )
@@ -77,6 +185,169 @@ class AntennaSerialLogger:
             print(f"  User: {self.mysql_config['user']}")
             sys.exit(1)
 
+    def write_rows(self, rows):
+        """Write rows to MySQL with one executemany and commit"""
+        # Reconnect lazily, once there is something to write
+        if not self._db_alive and not self.reconnect_db():
+            print(f"MySQL unavailable ({len(rows)} rows {self.FAILED_ROWS})")
+            return False
+
+        try:
+            self._insert_cursor.executemany(self._INSERT_SQL, rows)
+            self.db_conn.commit()
+            return True
+
+        except (OperationalError, InterfaceError) as e:
+            print(f"MySQL connection error: {e} ({len(rows)} rows {self.FAILED_ROWS})")
+            # Connection is lost: reconnect before the next batch
+            self._db_alive = False
+        except Error as e:
+            # Rejected rows: the connection itself is still usable
+            print(f"MySQL logging error: {e} ({len(rows)} rows {self.FAILED_ROWS})")
+            with contextlib.suppress(Error):
+                self.db_conn.rollback()
+        except Exception as e:
+            print(f"Logging error: {e} ({len(rows)} rows {self.FAILED_ROWS})")
+        return False
+
+    def reconnect_db(self):
+        """Attempt to reconnect to MySQL database"""
+        try:
+            if self.db_conn:
+                self.db_conn.close()
+
+            print("Attempting to reconnect to MySQL...")
+            self.db_conn = mysql.connector.connect(**self.mysql_config)
+
+            if self.db_conn.is_connected():
+                cursor = self.db_conn.cursor()
+                cursor.execute(f"USE {self.mysql_config['database']}")
+                cursor.close()
+
+                self._insert_cursor = self.db_conn.cursor()
+                self._db_alive = True
+                print("MySQL reconnection successful")
+                return True
+
+        except Error as e:
+            print(f"MySQL reconnection failed: {e}")
+        return False
+
+    def run(self, row_queue, rows_written, rows_failed):
+        """Insert batches from row_queue until a None sentinel arrives"""
+        stopping = False
+        while not stopping:
+            batch = row_queue.get()
+            if batch is None:
+                break
+
+            # Merge whatever else queued up while the last commit ran
+            rows = list(batch)
+            for _ in range(self.BATCH_SIZE - 1):
+                try:
+                    batch = row_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if batch is None:
+                    stopping = True
+                    break
+                rows.extend(batch)
+
+            counter = rows_written if self.write_rows(rows) else rows_failed
+            with counter.get_lock():
+                counter.value += len(rows)
+
+        if self._db_alive:
+            self.db_conn.close()
+
+
+def _run_writer(mysql_config, row_queue, rows_written, rows_failed):
+    """Entry point of the database writer process"""
+    writer = MySQLWriter(mysql_config)
+    writer.setup_database()
+    writer.run(row_queue, rows_written, rows_failed)
+
+
+class _Stats(ReceiveStats):
+    """Receive counters plus the number of duplicate reads skipped"""
+
+    __slots__ = ("duplicates_suppressed",)
+
+    def __init__(self):
+        super().__init__()
+        self.duplicates_suppressed = 0
+
+
+class AntennaSerialLogger:
+    BURST_THRESHOLD = 64  # Bytes of frames read at once above which they form a burst
+    READ_TIMEOUT = 1.0  # Longest blocking wait, so stop() is noticed
+    INTER_BYTE_TIMEOUT = 0.05  # Idle gap after which a partial line is returned
+    DEDUP_WINDOW = 0.5  # Seconds during which a repeated tag read is skipped
+    DEDUP_CAPACITY = 4096  # Most recent (antenna, tag) reads remembered
+    QUEUE_SIZE = 10_000  # Batches buffered for the writer before dropping the oldest
+
+    def __init__(
+        self,
+        port,
+        baudrate=9600,
+        mysql_config=None,
+        serial_lock=None,
+        raw_log_path=None,
+    ):
+        self.port = port
+        self.baudrate = baudrate
+        self.mysql_config = mysql_config or {
+            "host": "localhost",
+            "database": "data_logs",
+            "user": "mateo",
+            "password": "password123",
+            "port": 3306,
+            "use_pure": not mysql.connector.HAVE_CEXT,  # C extension if installed
+        }
+        self.serial_conn = None
+        # Pass a shared lock when other threads also use this serial port
+        self._serial_lock = serial_lock or contextlib.nullcontext()
+        self.running = False
+        self.log_thread = None
+        self._stats = _Stats()
+
+        self._dedup = TagDeduplicator(self.DEDUP_WINDOW, self.DEDUP_CAPACITY)
+        self._duplicates_pending = 0
+        self._duplicates_reported = 0.0
+
+        # Decoding and logging run here so the reader goes straight back to
+        # waiting on the port; one worker keeps frames in arrival order
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="rfid-proc"
+        )
+
+        # Rows are handed to a separate writer process that owns MySQL
+        self._mp_context = multiprocessing.get_context("spawn")
+        self._row_queue = self._mp_context.Queue(maxsize=self.QUEUE_SIZE)
+        self._rows_written = self._mp_context.Value("Q", 0)
+        self._rows_failed = self._mp_context.Value("Q", 0)
+        self._rows_dropped = 0
+        self.writer_process = None
+        self._writer_exit_reported = False
+
+        # With a raw log, that append-only file is the only sink and
+        # tail_and_ingest.py copies it into MySQL; without one, rows go
+        # straight to the writer process
+        self.raw_log_path = raw_log_path
+        self._raw_fd = None
+        if raw_log_path:
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+            self._raw_fd = os.open(raw_log_path, flags, 0o644)
+        else:
+            self.setup_database()
+            self.start_writer()
+
+    def setup_database(self):
+        """Check the MySQL configuration and create the table up front"""
+        writer = MySQLWriter(self.mysql_config)
+        writer.setup_database()
+        writer.db_conn.close()
+
     def connect(self):
         """Connect with detailed error reporting"""
         try:
@@ -85,7 +356,8 @@ class AntennaSerialLogger:
             self.serial_conn = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=0.1,  # Short timeout for non-blocking reads
+                timeout=self.READ_TIMEOUT,
+                inter_byte_timeout=self.INTER_BYTE_TIMEOUT,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
@@ -105,52 +377,65 @@ class AntennaSerialLogger:
             return False
 
     def log_data(self, data, raw_bytes, antenna, data_type="auto_received"):
-        """Log data with antenna info to MySQL"""
-        try:
-            if self.db_conn and self.db_conn.is_connected():
-                cursor = self.db_conn.cursor()
-
-                # Convert raw_bytes to hex string for storage
-                raw_bytes_hex = (
-                    raw_bytes.hex() if isinstance(raw_bytes, bytes) else str(raw_bytes)
-                )
+        """Queue data with antenna info for the writer process"""
+        # Raw bytes are stored as-is in the BLOB column
+        if not isinstance(raw_bytes, bytes):
+            raw_bytes = str(raw_bytes).encode()
 
-                query = """
-                    INSERT INTO serial_logs (data, data_type, raw_bytes, byte_count, antenna)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                values = (data, data_type, raw_bytes_hex, len(raw_bytes), antenna)
+        self.log_rows([(data, data_type, raw_bytes, len(raw_bytes), antenna)])
 
-                cursor.execute(query, values)
-                self.db_conn.commit()
-                cursor.close()
+    def log_rows(self, rows):
+        """Queue several (data, data_type, raw_bytes, byte_count, antenna) rows"""
+        if self.writer_process is None:
+            return
 
-        except Error as e:
-            print(f"MySQL logging error: {e}")
-            # Try to reconnect if connection was lost
-            self.reconnect_db()
-        except Exception as e:
-            print(f"Logging error: {e}")
+        if not self.writer_process.is_alive():
+            # Writer exited (e.g. MySQL setup failed): nothing reads the queue
+            self._rows_dropped += len(rows)
+            if not self._writer_exit_reported:
+                print(
+                    f"MySQL writer exited (code {self.writer_process.exitcode}): rows are no longer written"
+                )
+                self._writer_exit_reported = True
+            return
 
-    def reconnect_db(self):
-        """Attempt to reconnect to MySQL database"""
         try:
-            if self.db_conn:
-                self.db_conn.close()
-
-            print("Attempting to reconnect to MySQL...")
-            self.db_conn = mysql.connector.connect(**self.mysql_config)
-
-            if self.db_conn.is_connected():
-                cursor = self.db_conn.cursor()
-                cursor.execute(f"USE {self.mysql_config['database']}")
-                cursor.close()
-                print("MySQL reconnection successful")
-                return True
+            self._row_queue.put_nowait(rows)
+        except queue.Full:
+            # Writer is falling behind: drop the oldest batch to make room
+            try:
+                self._rows_dropped += len(self._row_queue.get_nowait())
+            except queue.Empty:
+                pass
+            self._row_queue.put_nowait(rows)
+
+    def _drain_queue(self):
+        """Empty the row queue and return how many rows it still held"""
+        rows = 0
+        while True:
+            try:
+                batch = self._row_queue.get(timeout=0.1)
+            except queue.Empty:
+                return rows
+            if batch is not None:
+                rows += len(batch)
+
+    def start_writer(self):
+        """Start the process that writes queued rows to MySQL"""
+        if self.writer_process and self.writer_process.is_alive():
+            return
 
-        except Error as e:
-            print(f"MySQL reconnection failed: {e}")
-            return False
+        self.writer_process = self._mp_context.Process(
+            target=_run_writer,
+            args=(
+                self.mysql_config,
+                self._row_queue,
+                self._rows_written,
+                self._rows_failed,
+            ),
+        )
+        self.writer_process.daemon = True
+        self.writer_process.start()
 
     def set_antenna(self, antenna_number):
         """Set the antenna to use (1 or 2)"""
@@ -185,63 +470,241 @@ class AntennaSerialLogger:
 
     def _monitor_loop(self):
         """Enhanced monitoring loop with antenna logging"""
+        selector = selectors.DefaultSelector()
+        selected_conn = selected_fd = None
+        pending = bytearray()  # Start of a line still waiting for its newline
+
+        # Bound once instead of looked up again on every read
+        submit = self._pool.submit
+        process_line = self._process_line
+        process_burst = self._process_burst
+        append_raw = self._append_raw
+        report_duplicates = self._report_duplicates
+        burst_threshold = self.BURST_THRESHOLD
+        _now = datetime.now
+        read_args = (self._serial_lock, self.INTER_BYTE_TIMEOUT, self.READ_TIMEOUT)
+
         while self.running:
             try:
-                if self.serial_conn and self.serial_conn.is_open:
-                    # Try to read a line
+                serial_conn = self.serial_conn
+                if serial_conn and serial_conn.is_open:
                     try:
-                        raw_data = self.serial_conn.readline()
-                        if raw_data:
-                            self.stats["bytes_received"] += len(raw_data)
-                            self.stats["messages_received"] += 1
-                            self.stats["last_data_time"] = datetime.now()
-
-                            # Try to decode
-                            try:
-                                decoded_data = raw_data.decode("utf-8").strip()
-                                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                                print(
-                                    f"[{timestamp}] ANTENNA {self.current_antenna}: '{decoded_data}' (bytes: {len(raw_data)})"
-                                )
-                                self.log_data(
-                                    decoded_data,
-                                    raw_data,
-                                    self.current_antenna,
-                                    "auto_received",
-                                )
-                            except UnicodeDecodeError:
-                                # Handle binary data
-                                hex_data = raw_data.hex()
-                                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                                print(
-                                    f"[{timestamp}] ANTENNA {self.current_antenna} BINARY: {hex_data} (bytes: {len(raw_data)})"
-                                )
-                                self.log_data(
-                                    hex_data,
-                                    raw_data,
-                                    self.current_antenna,
-                                    "binary_received",
-                                )
+                        if serial_conn is not selected_conn:
+                            # New connection: watch its descriptor instead
+                            if selected_fd is not None:
+                                selector.unregister(selected_fd)
+                            selected_conn = serial_conn
+                            selected_fd = serial_fileno(serial_conn)
+                            if selected_fd is not None:
+                                selector.register(selected_fd, selectors.EVENT_READ)
+                            pending.clear()
+
+                        if selected_fd is None:
+                            self._read_line()
+                            continue
+
+                        chunk = read_available(
+                            selector, selected_fd, pending, *read_args
+                        )
+                        if not chunk:
+                            # Idle: report duplicates still waiting for a summary
+                            if self._duplicates_pending:
+                                submit(report_duplicates, time.time())
+                            continue
+
+                        now = _now()
+                        antenna = self.current_antenna
+                        lines = split_lines(chunk)
+                        append_raw(lines, now, antenna)
+
+                        # Small reads keep per-frame output; large ones are batched
+                        if len(lines) > 1 and len(chunk) > burst_threshold:
+                            submit(process_burst, lines, now, antenna)
+                        else:
+                            for line in lines:
+                                submit(process_line, line, now, antenna)
 
                     except Exception as read_error:
                         print(f"Read error: {read_error}")
-
-                time.sleep(0.01)  # Very short sleep
+                        # A hung-up port stays readable: don't spin on it
+                        time.sleep(1)
+                else:
+                    time.sleep(1)  # No open port to block on
 
             except Exception as e:
                 print(f"Monitor loop error: {e}")
                 time.sleep(1)
 
+        selector.close()
+
+    def _read_line(self):
+        """Fallback for ports without a pollable descriptor: block in readline()"""
+        with self._serial_lock:
+            raw_data = self.serial_conn.readline()
+        if raw_data:
+            now = datetime.now()
+            self._append_raw((raw_data,), now, self.current_antenna)
+            self._pool.submit(self._process_line, raw_data, now, self.current_antenna)
+
+            # Drain a burst of frames in one read
+            with self._serial_lock:
+                bytes_waiting = self.serial_conn.in_waiting
+            if bytes_waiting > self.BURST_THRESHOLD:
+                self._read_burst()
+        elif self._duplicates_pending:
+            self._pool.submit(self._report_duplicates, time.time())
+
+    def _process_line(self, raw_data, now, antenna):
+        """Decode, print and queue one received line (runs on the pool)"""
+        try:
+            self._stats.bytes_received += len(raw_data)
+            self._stats.messages_received += 1
+            self._stats.last_data_time = now
+            timestamp = fmt_ts(now)
+
+            # Try to decode
+            decoded_data = decode_text(raw_data)
+            if decoded_data is not None:
+                decoded_data = decoded_data.strip()
+                if self._is_duplicate(antenna, decoded_data, now):
+                    return
+                log.info(
+                    "[%s] ANTENNA %s: '%s' (bytes: %d)",
+                    timestamp,
+                    antenna,
+                    decoded_data,
+                    len(raw_data),
+                )
+                self.log_data(decoded_data, raw_data, antenna, "auto_received")
+            else:
+                # Handle binary data
+                hex_data = raw_data.hex()
+                if self._is_duplicate(antenna, hex_data, now):
+                    return
+                log.info(
+                    "[%s] ANTENNA %s BINARY: %s (bytes: %d)",
+                    timestamp,
+                    antenna,
+                    hex_data,
+                    len(raw_data),
+                )
+                self.log_data(hex_data, raw_data, antenna, "binary_received")
+
+        except Exception as e:
+            print(f"Processing error: {e}")
+
+    def _read_burst(self):
+        """Read every pending line in one call and hand them off as one batch"""
+        with self._serial_lock:
+            buf = self.serial_conn.read(self.serial_conn.in_waiting)
+            if not buf.endswith(b"\n"):
+                # Finish the last line so frames are not split across reads
+                buf += self.serial_conn.readline()
+
+        now = datetime.now()
+        lines = split_lines(buf)
+        self._append_raw(lines, now, self.current_antenna)
+        self._pool.submit(self._process_burst, lines, now, self.current_antenna)
+
+    def _append_raw(self, lines, now, antenna):
+        """Append frames to the raw log with a single write, if it is enabled"""
+        if self._raw_fd is None:
+            return
+
+        data = _pack_records(lines, now, antenna)
+        try:
+            written = os.write(self._raw_fd, data)
+            if written < len(data):
+                # Cut the partial record so the log stays readable
+                end = os.lseek(self._raw_fd, 0, os.SEEK_END)
+                os.ftruncate(self._raw_fd, end - written)
+                raise OSError(f"short write ({written} of {len(data)} bytes)")
+
+        except OSError as e:
+            # Send later frames straight to MySQL instead of losing them
+            print(f"Raw log error: {e} (raw log disabled, writing to MySQL directly)")
+            with contextlib.suppress(OSError):
+                os.close(self._raw_fd)
+            self._raw_fd = None
+            self.start_writer()
+
+    def _process_burst(self, lines, now, antenna):
+        """Queue the frames of a burst together (runs on the pool)"""
+        try:
+            byte_count = sum(map(len, lines))
+            rows = []
+            for line in lines:
+                row = frame_row(line, antenna)
+                if not self._is_duplicate(antenna, row[0], now):
+                    rows.append(row)
+
+            self._stats.bytes_received += byte_count
+            self._stats.messages_received += len(lines)
+            self._stats.last_data_time = now
+            if not rows:
+                return
+            self.log_rows(rows)
+            log.info(
+                "[%s] ANTENNA %s BURST: %d frames (bytes: %d)",
+                fmt_ts(now),
+                antenna,
+                len(rows),
+                byte_count,
+            )
+
+        except Exception as e:
+            print(f"Processing error: {e}")
+
+    def _is_duplicate(self, antenna, data, now):
+        """Return True if this tag was logged on this antenna within DEDUP_WINDOW"""
+        seen_at = now.timestamp()
+        duplicate = self._dedup.is_duplicate(antenna, data, seen_at)
+        if duplicate:
+            self._stats.duplicates_suppressed += 1
+            self._duplicates_pending += 1
+        self._report_duplicates(seen_at)
+        return duplicate
+
+    def _report_duplicates(self, now_ts, force=False):
+        """Summarize suppressed reads, at most once per second unless forced"""
+        if not self._duplicates_pending:
+            return
+        if force or now_ts - self._duplicates_reported >= 1:
+            log.info("%d duplicate reads suppressed", self._duplicates_pending)
+            self._duplicates_pending = 0
+            self._duplicates_reported = now_ts
+
+    @property
+    def stats(self):
+        """Snapshot of the receive statistics as a dict"""
+        return {
+            "bytes_received": self._stats.bytes_received,
+            "messages_received": self._stats.messages_received,
+            "last_data_time": self._stats.last_data_time,
+            "duplicates_suppressed": self._stats.duplicates_suppressed,
+        }
+
     def show_stats(self):
         """Show monitoring statistics"""
         print(
-            f"STATS: {self.stats['messages_received']} messages, {self.stats['bytes_received']} bytes total"
+            f"STATS: {self._stats.messages_received} messages, {self._stats.bytes_received} bytes total"
         )
-        if self.stats["last_data_time"]:
-            print(f"   Last data: {self.stats['last_data_time'].strftime('%H:%M:%S')}")
+        if self._stats.last_data_time:
+            print(f"   Last data: {self._stats.last_data_time.strftime('%H:%M:%S')}")
         else:
             print("   No data received yet")
         print(f"   Current antenna: {getattr(self, 'current_antenna', 'Not set')}")
+        print(f"   Duplicate reads suppressed: {self._stats.duplicates_suppressed}")
+        if self.writer_process is None:
+            print(f"   MySQL: copied from {self.raw_log_path} by tail_and_ingest.py")
+        else:
+            print(
+                f"   Rows written: {self._rows_written.value} (dropped: {self._rows_dropped}, failed: {self._rows_failed.value})"
+            )
+            if self.writer_process.exitcode not in (None, 0):
+                print(
+                    f"   MySQL writer exited with code {self.writer_process.exitcode}"
+                )
 
     def stop(self):
         """Stop monitoring and close connections"""
@@ -254,18 +717,67 @@ class AntennaSerialLogger:
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
 
-        if self.db_conn and self.db_conn.is_connected():
-            self.db_conn.close()
+        # Finish processing frames already read before stopping the writer
+        self._pool.shutdown(wait=True)
+        self._report_duplicates(time.time(), force=True)
+
+        if self._raw_fd is not None:
+            os.close(self._raw_fd)
+            self._raw_fd = None
+
+        # Let the writer drain the queue, then wait for it to exit
+        if self.writer_process:
+            if self.writer_process.is_alive():
+                try:
+                    self._row_queue.put(None, timeout=2)
+                    self.writer_process.join(timeout=5)
+                except queue.Full:
+                    pass
+                if self.writer_process.is_alive():
+                    self.writer_process.terminate()
+                    self.writer_process.join(timeout=2)
+
+            if self.writer_process.exitcode != 0:
+                # Nobody reads the queue any more: count what is left and keep
+                # its feeder thread from blocking interpreter exit
+                self._rows_dropped += self._drain_queue()
+                self._row_queue.cancel_join_thread()
 
         print("Monitor stopped")
         self.show_stats()
 
 
+def _start_handler(logger):
+    """Start monitoring and block until Ctrl+C"""
+    antenna = getattr(logger, "current_antenna", 1)
+    logger.start_monitoring(antenna)
+    print(
+        f"Monitoring started with antenna {antenna}. Press Ctrl+C to stop monitoring."
+    )
+    try:
+        while logger.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.running = False
+        print("\nMonitoring stopped.")
+
+
+# Interactive commands, looked up by exact (lower-cased) input
+COMMANDS = {
+    "antenna 1": lambda logger: logger.set_antenna(1),
+    "antenna 2": lambda logger: logger.set_antenna(2),
+    "start": _start_handler,
+    "stats": lambda logger: logger.show_stats(),
+}
+
+
 # Main script
 if __name__ == "__main__":
     # Configuration
     PORT = "/dev/ttyUSB0"  # Change this to your port
     BAUDRATE = 9600
+    DEBUG = False  # Print every received message instead of at most 20 per second
+    RAW_LOG = "tags.bin"  # Run tail_and_ingest.py to fill MySQL (None: write directly)
 
     # MySQL configuration
     MYSQL_CONFIG = {
@@ -274,6 +786,7 @@ if __name__ == "__main__":
         "user": "mateo",
         "password": "password123",
         "port": 3306,
+        "use_pure": not mysql.connector.HAVE_CEXT,  # C extension if installed
         "autocommit": True,
         "charset": "utf8mb4",
     }
@@ -284,9 +797,13 @@ if __name__ == "__main__":
     print(f"Baudrate: {BAUDRATE}")
     print(f"MySQL Host: {MYSQL_CONFIG['host']}:{MYSQL_CONFIG['port']}")
     print(f"Database: {MYSQL_CONFIG['database']}")
+    print(
+        f"MySQL C extension: {'available' if mysql.connector.HAVE_CEXT else 'not installed'}"
+    )
     print("=" * 50)
 
-    logger = AntennaSerialLogger(PORT, BAUDRATE, MYSQL_CONFIG)
+    log_listener = setup_logging(log, DEBUG)
+    logger = AntennaSerialLogger(PORT, BAUDRATE, MYSQL_CONFIG, raw_log_path=RAW_LOG)
 
     try:
         # Connect
@@ -305,24 +822,10 @@ if __name__ == "__main__":
 
                     if user_input == "quit":
                         break
-                    elif user_input == "antenna 1":
-                        logger.set_antenna(1)
-                    elif user_input == "antenna 2":
-                        logger.set_antenna(2)
-                    elif user_input == "start":
-                        antenna = getattr(logger, "current_antenna", 1)
-                        logger.start_monitoring(antenna)
-                        print(
-                            f"Monitoring started with antenna {antenna}. Press Ctrl+C to stop monitoring."
-                        )
-                        try:
-                            while logger.running:
-                                time.sleep(1)
-                        except KeyboardInterrupt:
-                            logger.running = False
-                            print("\nMonitoring stopped.")
-                    elif user_input == "stats":
-                        logger.show_stats()
+
+                    handler = COMMANDS.get(user_input)
+                    if handler:
+                        handler(logger)
                     else:
                         print(
                             "Invalid command. Use 'antenna 1', 'antenna 2', 'start', 'stats', or 'quit'"
@@ -340,3 +843,4 @@ if __name__ == "__main__":
 
     finally:
         logger.stop()
+        log_listener.stop()
@@ -0,0 +1,121 @@
+import serial
+import os
+import time
+import sys
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import numpy as np
+
+
+def fmt_ts(now):
+    """Format a datetime as HH:MM:SS.mmm for console output"""
+    return now.strftime("%H:%M:%S") + f".{now.microsecond // 1000:03d}"
+
+
+def decode_text(raw_data):
+    """Decode a line as text, or return None if it is binary"""
+    # isascii() is a cheap C-level scan, so the common case never raises
+    if raw_data.isascii():
+        return raw_data.decode("ascii")
+    text = raw_data.decode("utf-8", "replace")
+    return None if "\ufffd" in text else text
+
+
+def split_lines(buf):
+    """Split a buffer after every newline, keeping any trailing partial line"""
+    # A single line is the common case and cheaper than a NumPy scan
+    newline_count = buf.count(b"\n")
+    if newline_count == 0 or (newline_count == 1 and buf.endswith(b"\n")):
+        return [buf] if buf else []
+
+    newlines = np.flatnonzero(np.frombuffer(buf, dtype=np.uint8) == 0x0A)
+    bounds = [0, *(newlines + 1).tolist()]
+    if bounds[-1] != len(buf):
+        bounds.append(len(buf))
+    return [buf[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def serial_fileno(serial_conn):
+    """Return the port's file descriptor, or None if it has none (Windows)"""
+    try:
+        return serial_conn.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def read_available(selector, fd, pending, serial_lock, idle_timeout, timeout):
+    """Block until the port is readable and return the complete lines read"""
+    # While part of a line is buffered, a short idle gap releases it as-is
+    if not selector.select(idle_timeout if pending else timeout):
+        chunk = bytes(pending)
+        pending.clear()
+        return chunk
+
+    with serial_lock:
+        data = os.read(fd, 4096)
+    if not data:
+        raise serial.SerialException("port is readable but returned no data")
+
+    pending += data
+    end = pending.rfind(b"\n") + 1
+    chunk = bytes(pending[:end])
+    del pending[:end]
+    return chunk
+
+
+class RateLimitFilter(logging.Filter):
+    """Pass at most max_per_second records and count the ones dropped"""
+
+    def __init__(self, max_per_second):
+        super().__init__()
+        self.max_per_second = max_per_second
+        self.window_start = 0.0
+        self.passed = 0
+        self.suppressed = 0
+
+    def filter(self, record):
+        now = time.monotonic()
+        if now - self.window_start >= 1:
+            if self.suppressed:
+                record.msg = (
+                    f"({self.suppressed} messages suppressed) {record.getMessage()}"
+                )
+                record.args = None
+            self.window_start = now
+            self.passed = 0
+            self.suppressed = 0
+
+        if self.passed >= self.max_per_second:
+            self.suppressed += 1
+            return False
+
+        self.passed += 1
+        return True
+
+
+def setup_logging(logger, debug=False, max_per_second=20):
+    """Print per-message output from a listener thread, rate-limited unless debug"""
+    log_queue = queue.Queue()
+    queue_handler = QueueHandler(log_queue)
+    if not debug:
+        queue_handler.addFilter(RateLimitFilter(max_per_second))
+
+    logger.addHandler(queue_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    return listener
+
+
+class ReceiveStats:
+    """Receive counters, slotted so the monitor loop updates them cheaply"""
+
+    __slots__ = ("bytes_received", "messages_received", "last_data_time")
+
+    def __init__(self):
+        self.bytes_received = 0
+        self.messages_received = 0
+        self.last_data_time = None
@@ -0,0 +1,167 @@
+import mmap
+import os
+import time
+import mysql.connector
+from datetime import datetime
+from script2 import (
+    AntennaSerialLogger,
+    MySQLWriter,
+    TagDeduplicator,
+    frame_row,
+    iter_records,
+)
+
+
+class RawLogIngester(MySQLWriter):
+    """Follows the raw tag log and copies new records into MySQL"""
+
+    BATCH_ROWS = 1000  # Rows per executemany and offset checkpoint
+    POLL_INTERVAL = 0.5  # Seconds to wait when the log has no new records
+    FAILED_ROWS = "not committed"
+    _INSERT_SQL = """
+        INSERT INTO serial_logs
+            (timestamp, data, data_type, raw_bytes, byte_count, antenna)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """
+
+    def __init__(self, raw_log_path, mysql_config):
+        super().__init__(mysql_config)
+        self.raw_log_path = raw_log_path
+        self.offset_path = raw_log_path + ".offset"
+        self.rejected_path = raw_log_path + ".rejected"
+        self.offset = self.load_offset()
+
+        # Same repeat filter as the logger, keyed on capture time
+        self._dedup = TagDeduplicator(
+            AntennaSerialLogger.DEDUP_WINDOW, AntennaSerialLogger.DEDUP_CAPACITY
+        )
+        self.duplicates_skipped = 0
+        self.records_rejected = 0
+
+    def load_offset(self):
+        """Read the last committed offset, or start from the beginning"""
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def save_offset(self, offset):
+        """Atomically record how far the log has been ingested"""
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+        self.offset = offset
+
+    def ingest_available(self):
+        """Insert every complete record past the offset; return rows written"""
+        try:
+            size = os.path.getsize(self.raw_log_path)
+        except FileNotFoundError:
+            return 0
+        if size <= self.offset:
+            return 0
+
+        written = 0
+        with open(self.raw_log_path, "rb") as f:
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as buf:
+                checkpoint = self._dedup.copy()
+                batch = []  # (row, record start, record end)
+                start = self.offset
+                for end, ts_ns, antenna, frame in iter_records(buf, self.offset):
+                    row = frame_row(frame, antenna)
+                    if self._dedup.is_duplicate(antenna, row[0], ts_ns / 1e9):
+                        self.duplicates_skipped += 1
+                    else:
+                        timestamp = datetime.fromtimestamp(ts_ns / 1e9)
+                        batch.append(((timestamp, *row), start, end))
+                    start = end
+
+                    if len(batch) >= self.BATCH_ROWS:
+                        inserted = self.commit_batch(buf, batch, end)
+                        if inserted is None:
+                            self._dedup = checkpoint
+                            return written
+                        written += inserted
+                        checkpoint = self._dedup.copy()
+                        batch = []
+
+                if start != self.offset:
+                    inserted = self.commit_batch(buf, batch, start)
+                    if inserted is None:
+                        self._dedup = checkpoint
+                        return written
+                    written += inserted
+        return written
+
+    def commit_batch(self, buf, batch, end_offset):
+        """Insert a batch and move the offset past it; return None to retry it"""
+        if not batch or self.write_rows([row for row, _, _ in batch]):
+            self.save_offset(end_offset)
+            return len(batch)
+        if not self._db_alive:
+            return None  # Connection lost: retry from the same offset
+
+        # MySQL rejected the batch: find the bad records one at a time
+        inserted = 0
+        for row, start, end in batch:
+            if self.write_rows([row]):
+                inserted += 1
+            elif not self._db_alive:
+                return None
+            else:
+                self.reject_record(buf[start:end], start)
+            self.save_offset(end)
+        self.save_offset(end_offset)
+        return inserted
+
+    def reject_record(self, record, offset):
+        """Set aside a record MySQL refused, in the raw log format"""
+        with open(self.rejected_path, "ab") as f:
+            f.write(record)
+        self.records_rejected += 1
+        print(f"Record at offset {offset} set aside in {self.rejected_path}")
+
+    def run_forever(self):
+        """Poll the raw log and ingest new records until interrupted"""
+        print(f"Following {self.raw_log_path} from offset {self.offset}")
+        while True:
+            written = self.ingest_available()
+            if written:
+                print(
+                    f"Ingested {written} rows (offset {self.offset}, duplicates skipped: {self.duplicates_skipped}, rejected: {self.records_rejected})"
+                )
+            else:
+                time.sleep(self.POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    # Configuration
+    RAW_LOG = "tags.bin"  # Same path as RAW_LOG in script2.py
+
+    # MySQL configuration
+    MYSQL_CONFIG = {
+        "host": "localhost",
+        "database": "data_logs",
+        "user": "mateo",
+        "password": "password123",
+        "port": 3306,
+        "use_pure": not mysql.connector.HAVE_CEXT,  # C extension if installed
+        "autocommit": True,
+        "charset": "utf8mb4",
+    }
+
+    print("RFID Raw Log Ingester")
+    print("=" * 50)
+
+    ingester = RawLogIngester(RAW_LOG, MYSQL_CONFIG)
+    ingester.setup_database()
+
+    try:
+        ingester.run_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        if ingester.db_conn:
+            ingester.db_conn.close()
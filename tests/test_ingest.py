@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta
+
+import pytest
+from mysql.connector import DataError, OperationalError
+
+from script2 import _pack_records, iter_records
+from tail_and_ingest import RawLogIngester
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+MYSQL_CONFIG = {"host": "h", "port": 3306, "database": "d", "user": "u"}
+
+
+class StubCursor:
+    """Records inserted rows; rejects raw bytes containing BAD, fails while down"""
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+
+    def executemany(self, sql, rows):
+        if self.down:
+            raise OperationalError("2013: Lost connection to MySQL server")
+        if any(b"BAD" in row[3] for row in rows):
+            raise DataError("1366: Incorrect string value")
+        self.rows.extend(rows)
+
+
+class StubConnection:
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def raw_log(tmp_path):
+    return tmp_path / "tags.bin"
+
+
+def make_ingester(raw_log):
+    ingester = RawLogIngester(str(raw_log), MYSQL_CONFIG)
+    ingester.db_conn = StubConnection()
+    ingester._insert_cursor = StubCursor()
+    ingester._db_alive = True
+    ingester.reconnect_db = lambda: False
+    return ingester
+
+
+def inserted_frames(ingester):
+    return [row[3] for row in ingester._insert_cursor.rows]
+
+
+def test_ingests_new_records_and_saves_offset(raw_log):
+    raw_log.write_bytes(_pack_records([b"A\n", b"B\n"], NOW, 1))
+    ingester = make_ingester(raw_log)
+
+    assert ingester.ingest_available() == 2
+    assert inserted_frames(ingester) == [b"A\n", b"B\n"]
+    assert ingester._insert_cursor.rows[0][0] == NOW
+    assert ingester.offset == raw_log.stat().st_size
+    assert ingester.ingest_available() == 0
+
+    # A restarted ingester resumes after what was committed
+    with raw_log.open("ab") as f:
+        f.write(_pack_records([b"C\n"], NOW + timedelta(seconds=1), 2))
+    restarted = make_ingester(raw_log)
+    assert restarted.ingest_available() == 1
+    assert inserted_frames(restarted) == [b"C\n"]
+
+
+def test_skips_repeats_within_window_of_capture_time(raw_log):
+    with raw_log.open("wb") as f:
+        f.write(_pack_records([b"A\n", b"A\n"], NOW, 1))
+        f.write(_pack_records([b"A\n"], NOW + timedelta(seconds=0.2), 1))
+        f.write(_pack_records([b"A\n"], NOW + timedelta(seconds=0.6), 1))
+    ingester = make_ingester(raw_log)
+
+    assert ingester.ingest_available() == 2
+    assert ingester.duplicates_skipped == 2
+    assert ingester.offset == raw_log.stat().st_size
+
+
+def test_rejected_record_is_set_aside(raw_log):
+    raw_log.write_bytes(_pack_records([b"A\n", b"BAD\n", b"C\n"], NOW, 1))
+    ingester = make_ingester(raw_log)
+
+    assert ingester.ingest_available() == 2
+    assert inserted_frames(ingester) == [b"A\n", b"C\n"]
+    assert ingester.offset == raw_log.stat().st_size
+
+    rejected = (raw_log.parent / "tags.bin.rejected").read_bytes()
+    assert [frame for _, _, _, frame in iter_records(rejected)] == [b"BAD\n"]
+
+
+def test_lost_connection_retries_from_same_offset(raw_log):
+    raw_log.write_bytes(_pack_records([b"A\n", b"B\n"], NOW, 1))
+    ingester = make_ingester(raw_log)
+    ingester._insert_cursor.down = True
+
+    assert ingester.ingest_available() == 0
+    assert ingester.offset == 0
+    assert not (raw_log.parent / "tags.bin.offset").exists()
+    assert not (raw_log.parent / "tags.bin.rejected").exists()
+
+    # The failed batch must not count as already seen on the retry
+    ingester._insert_cursor.down = False
+    ingester._db_alive = True
+    assert ingester.ingest_available() == 2
+    assert inserted_frames(ingester) == [b"A\n", b"B\n"]
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from script2 import RECORD_HEADER, TagDeduplicator, _pack_records, iter_records
+
+NOW = datetime(2026, 1, 1, 12, 0, 0, 123456)
+
+
+def test_pack_iter_round_trip():
+    frames = [b"TAG0001\n", b"\x01\xff\x00\n", b"partial"]
+    buf = _pack_records(frames, NOW, 2)
+
+    records = list(iter_records(buf))
+
+    assert [frame for _, _, _, frame in records] == frames
+    assert {antenna for _, _, antenna, _ in records} == {2}
+    assert {ts_ns for _, ts_ns, _, _ in records} == {
+        round(NOW.timestamp() * 1_000_000) * 1000
+    }
+    assert records[-1][0] == len(buf)
+
+
+def test_iter_records_resumes_from_offset():
+    buf = _pack_records([b"A\n"], NOW, 1) + _pack_records([b"B\n"], NOW, 2)
+    first_end = next(iter_records(buf))[0]
+
+    assert [frame for _, _, _, frame in iter_records(buf, first_end)] == [b"B\n"]
+
+
+def test_iter_records_stops_before_partial_record():
+    complete = _pack_records([b"A\n"], NOW, 1)
+    next_record = _pack_records([b"BBBBBB\n"], NOW, 1)
+
+    for cut in (1, RECORD_HEADER.size, len(next_record) - 1):
+        records = list(iter_records(complete + next_record[:cut]))
+        assert [frame for _, _, _, frame in records] == [b"A\n"]
+        assert records[-1][0] == len(complete)
+
+
+def test_long_frame_is_split_into_several_records():
+    frame = bytes(range(256)) * 300  # 76,800 bytes, over the 64 KiB length field
+    records = list(iter_records(_pack_records([frame], NOW, 1)))
+
+    assert [len(part) for _, _, _, part in records] == [0xFFFF, len(frame) - 0xFFFF]
+    assert b"".join(part for _, _, _, part in records) == frame
+
+
+def test_dedup_skips_repeats_within_window():
+    dedup = TagDeduplicator(window=0.5, capacity=16)
+
+    assert not dedup.is_duplicate(1, "TAG", 10.0)
+    assert dedup.is_duplicate(1, "TAG", 10.4)
+    assert not dedup.is_duplicate(2, "TAG", 10.4)
+    # The window runs from the last logged read, not the last duplicate
+    assert not dedup.is_duplicate(1, "TAG", 10.5)
+
+
+def test_dedup_evicts_least_recent_tag():
+    dedup = TagDeduplicator(window=0.5, capacity=2)
+    dedup.is_duplicate(1, "A", 0.0)
+    dedup.is_duplicate(1, "B", 0.0)
+    dedup.is_duplicate(1, "A", 0.1)  # Duplicate: A becomes most recent
+    dedup.is_duplicate(1, "C", 0.2)  # Evicts B
+
+    assert not dedup.is_duplicate(1, "B", 0.3)
+    assert dedup.is_duplicate(1, "C", 0.3)
+
+
+def test_dedup_copy_is_independent():
+    dedup = TagDeduplicator(window=0.5, capacity=16)
+    dedup.is_duplicate(1, "A", 0.0)
+    checkpoint = dedup.copy()
+    dedup.is_duplicate(1, "B", 0.0)
+
+    assert checkpoint.is_duplicate(1, "A", 0.1)
+    assert not checkpoint.is_duplicate(1, "B", 0.1)